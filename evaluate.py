@@ -1,8 +1,7 @@
 import os
 import json
 import argparse
-from groq import Groq
-from real_time import extract_text_from_pdf
+from real_time import extract_text_from_pdf, get_groq_client
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -70,7 +69,7 @@ def evaluate_interview(candidate_id, interview_name):
 
         # 4. Call the Groq API
         print("Sending request to Groq for evaluation...")
-        client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        client = get_groq_client()
         chat_completion = client.chat.completions.create(
             messages=[
                 {
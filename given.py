@@ -1,19 +1,25 @@
 from vosk import Model, KaldiRecognizer
 import pyaudio
+import webrtcvad
+import miniaudio
 import json
-from pynput import keyboard as pynput_keyboard
+import orjson
+import select
+import termios
+import tty
+from contextlib import contextmanager
 import threading
 import time
-from groq import Groq
+import queue
 import os
 from dotenv import load_dotenv
 import logging
-from rime import rime_tts
-import tempfile
+from rime import rime_tts, warm_up as rime_warm_up
 import sys
-import subprocess
 import argparse
-from real_time import extract_text_from_pdf, generate_resume_questions
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from real_time import extract_text_from_pdf, generate_resume_questions, get_groq_client
 
 # Set up logging for error handling
 logging.basicConfig(filename='voice_ai_chat.log', level=logging.ERROR, 
@@ -22,66 +28,257 @@ logging.basicConfig(filename='voice_ai_chat.log', level=logging.ERROR,
 # Load environment variables from .env file
 load_dotenv()
 
+# Rime is asked for 24 kHz audio; playback is decoded to mono 16-bit at this rate
+TTS_SAMPLE_RATE = 24000
+
+# webrtcvad only accepts 10/20/30 ms frames
+VAD_FRAME_MS = 20
+VAD_FRAME_SAMPLES = 16000 * VAD_FRAME_MS // 1000
+
+def _same_option(current, value):
+    try:
+        return float(current) == float(value)
+    except ValueError:
+        return current == str(value)
+
+def _write_decoder_conf(model_path, beam=None, lattice_beam=None, max_active=None):
+    """
+    Override decoder search options in the model's conf/model.conf, which Vosk reads at load time.
+    Only options that were passed and differ from the model's own values are written; if the
+    file can't be updated (e.g. a read-only model directory) the model is used as shipped.
+    """
+    conf_path = os.path.join(model_path, 'conf', 'model.conf')
+    overrides = {name: value for name, value in
+                 (('--beam', beam), ('--lattice-beam', lattice_beam), ('--max-active', max_active))
+                 if value is not None}
+    if not overrides or not os.path.exists(conf_path):
+        return
+    try:
+        with open(conf_path, 'r') as f:
+            lines = [line.strip() for line in f if line.strip()]
+        current = dict(line.split('=', 1) for line in lines if '=' in line)
+        changed = {name: value for name, value in overrides.items()
+                   if name not in current or not _same_option(current[name], value)}
+        if not changed:
+            return
+        lines = [line for line in lines if line.split('=')[0] not in changed]
+        lines += [f"{name}={value}" for name, value in changed.items()]
+        with open(conf_path, 'w') as f:
+            f.write("\n".join(lines) + "\n")
+    except OSError as e:
+        print(f"⚠️ Could not apply decoder settings to '{conf_path}', using the model's defaults: {e}")
+        logging.error(f"Decoder conf error: {e}")
+
+@functools.lru_cache(maxsize=4)
+def _load_vosk_model(model_path, beam=None, lattice_beam=None, max_active=None):
+    """Load a Vosk model once per path and decoder settings; recognizers built on it are cheap."""
+    _write_decoder_conf(model_path, beam, lattice_beam, max_active)
+    return Model(model_path)
+
+@contextmanager
+def _raw_mode():
+    """Put the terminal in cbreak mode so single keypresses can be read from stdin."""
+    if not sys.stdin.isatty():
+        yield
+        return
+    fd = sys.stdin.fileno()
+    old_attrs = termios.tcgetattr(fd)
+    try:
+        tty.setcbreak(fd)
+        yield
+    finally:
+        termios.tcsetattr(fd, termios.TCSADRAIN, old_attrs)
+
+def _read_key(timeout):
+    """Return the next key pressed (lowercased), or None if nothing arrives within timeout seconds.
+    EOF on stdin is reported as 'q' so callers quit instead of polling a dead input forever."""
+    fd = sys.stdin.fileno()
+    ready, _, _ = select.select([fd], [], [], timeout)
+    if ready:
+        # Read the fd directly so a second buffered key is still visible to select()
+        ch = os.read(fd, 1)
+        if not ch:
+            return 'q'
+        return ch.decode(errors='ignore').lower()
+    return None
+
+class _ChunkSource(miniaudio.StreamableSource):
+    """Feeds MP3 bytes from an iterable of chunks into the miniaudio decoder."""
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._buffer = bytearray()
+
+    def close(self):
+        if hasattr(self._chunks, 'close'):
+            self._chunks.close()
+
+    def read(self, num_bytes):
+        while len(self._buffer) < num_bytes:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                break
+            self._buffer.extend(chunk)
+        # The decoder only needs a buffer, so skip converting the sliced bytearray to bytes
+        data = self._buffer[:num_bytes]
+        del self._buffer[:num_bytes]
+        return data
+
 class AudioHandler:
-    def __init__(self, model_path="model"):
+    def __init__(self, model_path="model", beam=None, lattice_beam=None, max_active=None):
         if not os.path.exists(model_path):
             print(f"❌ Vosk model not found at '{model_path}'. Please download a model from https://alphacephei.com/vosk/models and extract it to '{model_path}'")
             exit(1)
-        self.model = Model(model_path)
+        # Decoder settings are opt-in; by default the model's own conf/model.conf is used unchanged
+        self.model = _load_vosk_model(model_path, beam, lattice_beam, max_active)
         self.rec = KaldiRecognizer(self.model, 16000)
+        self.rec.SetMaxAlternatives(0)
+        # Decode 1 s of silence so the first real answer doesn't pay Kaldi's lazy init cost
+        self.rec.AcceptWaveform(b"\x00" * 32000)
+        self.rec.Reset()
         self.recording = False
         self._stop_recording = False
         self._quit_flag = False
+        self.segments = []
         self.p = pyaudio.PyAudio()
+        self.vad = webrtcvad.Vad(2)
+        # Persistent output stream so each utterance skips device setup
+        self.out = self.p.open(format=pyaudio.paInt16, channels=1, rate=TTS_SAMPLE_RATE, output=True)
+        # Input stays open for the whole interview and is only started while listening
+        self._audio_q = queue.Queue()
+        self.stream = self.p.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True,
+                                  frames_per_buffer=VAD_FRAME_SAMPLES, stream_callback=self._on_audio,
+                                  start=False)
 
-    def listen_for_audio(self, max_duration=30):
-        print("\n🎤 Listening... Speak, then press 'R' to stop recording, 'Q' to quit")
+    def close(self):
+        """Release the audio streams and PortAudio; safe to call more than once."""
+        if self.p is None:
+            return
+        self.stream.close()
+        self.out.close()
+        self.p.terminate()
+        self.p = None
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+    def _on_audio(self, in_data, frame_count, time_info, status):
+        # Runs on the PortAudio thread; hand off without blocking
+        self._audio_q.put_nowait(in_data)
+        return (None, pyaudio.paContinue)
+
+    def play(self, chunks):
+        """Decode MP3 chunks in-process and write the PCM to the output stream as it decodes."""
+        with _ChunkSource(chunks) as source:
+            try:
+                for samples in miniaudio.stream_any(source, source_format=miniaudio.FileFormat.MP3,
+                                                    nchannels=1, sample_rate=TTS_SAMPLE_RATE, frames_to_read=4096):
+                    self.out.write(samples.tobytes())
+            except miniaudio.DecodeError:
+                # miniaudio swallows errors raised in the read callback; surface the real cause
+                if source.error_in_readcallback is not None:
+                    raise source.error_in_readcallback
+                raise
+            if source.error_in_readcallback is not None:
+                raise source.error_in_readcallback
+
+    def listen_for_audio(self, max_duration=30, silence_ms=700, min_speech_ms=200):
+        print("\n🎤 Listening... Speak and pause to finish (or press 'R' to stop), 'Q' to quit")
         self.recording = True
         self._stop_recording = False
         self._quit_flag = False
-        frames = []
-        stream = self.p.open(format=pyaudio.paInt16, channels=1, rate=16000, input=True, frames_per_buffer=8000)
-        stream.start_stream()
+        self.rec.Reset()
+        self.segments = []
+        got_audio = False
+        heard_speech = False
+        speech_frames = 0
+        silence_frames = 0
+        last_partial = ""
+        # Drop anything left over from the previous answer
+        while not self._audio_q.empty():
+            self._audio_q.get_nowait()
+        self.stream.start_stream()
         start_time = time.time()
-
-        def on_press(key):
-            try:
-                if key.char and key.char.lower() == 'r':
-                    self._stop_recording = True
-                elif key.char and key.char.lower() == 'q':
-                    self._quit_flag = True
-            except AttributeError:
-                pass
-
-        with pynput_keyboard.Listener(on_press=on_press) as listener:
-            while self.recording:
-                if self._stop_recording or self._quit_flag:
-                    self.recording = False
-                    if self._stop_recording:
-                        print("🛑 Recording stopped!")
-                    break
-                if time.time() - start_time > max_duration:
-                    print("⏰ Maximum recording duration reached.")
-                    self.recording = False
-                    break
-                data = stream.read(4000, exception_on_overflow=False)
-                frames.append(data)
-                time.sleep(0.1)
-            listener.stop()
-        stream.stop_stream()
-        stream.close()
+        try:
+            with _raw_mode():
+                while self.recording:
+                    key = _read_key(0)
+                    if key == 'r':
+                        self._stop_recording = True
+                    elif key == 'q':
+                        self._quit_flag = True
+                    if self._stop_recording or self._quit_flag:
+                        self.recording = False
+                        if last_partial:
+                            print()
+                        if self._stop_recording:
+                            print("🛑 Recording stopped!")
+                        break
+                    if time.time() - start_time > max_duration:
+                        if last_partial:
+                            print()
+                        print("⏰ Maximum recording duration reached.")
+                        self.recording = False
+                        break
+                    try:
+                        data = self._audio_q.get(timeout=0.05)
+                    except queue.Empty:
+                        continue
+                    got_audio = True
+                    # End the utterance once the candidate has spoken and then stayed silent.
+                    # Only a sustained run of speech arms this, so a key click or breath doesn't.
+                    if self.vad.is_speech(data, 16000):
+                        speech_frames += 1
+                        silence_frames = 0
+                        if speech_frames * VAD_FRAME_MS >= min_speech_ms:
+                            heard_speech = True
+                    else:
+                        speech_frames = 0
+                        if heard_speech:
+                            silence_frames += 1
+                            if silence_frames * VAD_FRAME_MS >= silence_ms:
+                                self._stop_recording = True
+                    # Feed the online decoder as we go so the transcript is ready on stop
+                    if self.rec.AcceptWaveform(data):
+                        # Kaldi hit an endpoint mid-answer; keep the finished segment
+                        self.segments.append(orjson.loads(self.rec.Result()).get("text", ""))
+                    else:
+                        partial = orjson.loads(self.rec.PartialResult()).get("partial", "")
+                        if partial and partial != last_partial:
+                            # \x1b[K clears what's left of a longer previous partial
+                            print(f"\r… {partial}\x1b[K", end="", flush=True)
+                            last_partial = partial
+        finally:
+            # Stop even on Ctrl-C so the callback doesn't keep filling the queue
+            self.stream.stop_stream()
         if self._quit_flag:
             raise KeyboardInterrupt
-        return b"".join(frames)
+        return got_audio
 
 class AIInterviewer:
     def __init__(self, candidate_id, interview_name):
         self.candidate_id = candidate_id
         self.interview_name = interview_name
         self.transcript = []
+        self.transcript_path = self._transcript_path()
+        self._tx_fp = None
         self.questions = self.load_questions()
         self.audio_handler = AudioHandler()
-        self.client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+        self.client = get_groq_client()
+        # Background TTS (and resume prep) so work overlaps with the candidate's answers
+        self.executor = ThreadPoolExecutor(max_workers=3)
+        self._pending_tts = {}
+        threading.Thread(target=self._warm_up_connections, daemon=True).start()
+
+    def _warm_up_connections(self):
+        """Pre-open the Rime and Groq TLS connections while the interview starts."""
+        rime_warm_up()
+        try:
+            self.client.models.list()
+        except Exception as e:
+            logging.error(f"Groq warm-up error: {e}")
 
     def load_questions(self):
         """Load questions from the specified JSON file."""
@@ -89,35 +286,38 @@ class AIInterviewer:
         if not os.path.exists(questions_path):
             print(f"❌ Questions file not found at '{questions_path}'")
             exit(1)
-        with open(questions_path, 'r') as f:
-            data = json.load(f)
+        with open(questions_path, 'rb') as f:
+            data = orjson.loads(f.read())
             # Assuming the structure is { "topic": { "questions": [...] } }
             key = list(data.keys())[0]
             return data[key]['questions']
 
+    def _synthesize(self, text):
+        """Synthesize text with Rime and return the whole MP3 as bytes."""
+        return b"".join(rime_tts(text))
+
+    def prefetch_speech(self, text):
+        """Start synthesizing text in the background so a later speak() can play it right away."""
+        if text and text not in self._pending_tts:
+            self._pending_tts[text] = self.executor.submit(self._synthesize, text)
+
     def speak(self, text):
         print(f"AI: {text}")
         try:
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.mp3') as tmpfile:
-                rime_tts(text, tmpfile.name)
-                tmpfile.flush()
-                try:
-                    subprocess.run(['mpg123', tmpfile.name], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-                except FileNotFoundError:
-                    subprocess.run(['ffplay', '-nodisp', '-autoexit', tmpfile.name], check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            future = self._pending_tts.pop(text, None)
+            # Prefetched audio is already in memory; otherwise play as the stream arrives
+            chunks = [future.result()] if future else rime_tts(text)
+            self.audio_handler.play(chunks)
         except Exception as e:
             print(f"❌ Error in TTS: {e}")
             logging.error(f"TTS error: {e}")
     
-    def speech_to_text(self, audio_bytes):
-        if not audio_bytes:
-            return None
+    def speech_to_text(self):
+        """Finalize the utterance already streamed into the recognizer."""
         try:
-            print("🔄 Converting speech to text...")
             rec = self.audio_handler.rec
-            rec.AcceptWaveform(audio_bytes)
-            result = json.loads(rec.Result())
-            text = result.get("text", "")
+            result = orjson.loads(rec.FinalResult())
+            text = " ".join(t for t in self.audio_handler.segments + [result.get("text", "")] if t)
             if text:
                 print(f"You said: {text}")
                 return text
@@ -133,52 +333,74 @@ class AIInterviewer:
         """Wait for 'e' to start listening or 'q' to quit."""
         print("\nPress 'E' to start answering, or 'Q' to quit the interview.")
         key_pressed = {'e': False, 'q': False}
-        def on_press(key):
-            try:
-                if key.char and key.char.lower() == 'e':
-                    key_pressed['e'] = True
-                    return False
-                elif key.char and key.char.lower() == 'q':
-                    key_pressed['q'] = True
-                    return False
-            except AttributeError:
-                pass
-        with pynput_keyboard.Listener(on_press=on_press) as listener:
-            listener.join()
-        return key_pressed
+        with _raw_mode():
+            while True:
+                key = _read_key(0.05)
+                if key in key_pressed:
+                    key_pressed[key] = True
+                    return key_pressed
 
-    def save_transcript(self):
-        """Save the interview transcript to a JSON file."""
+    def _transcript_path(self):
         transcript_dir = 'interview_transcript'
         if not os.path.exists(transcript_dir):
             os.makedirs(transcript_dir)
-        filename = os.path.join(transcript_dir, f'candidate_{self.candidate_id}_{self.interview_name}.json')
-        with open(filename, 'w') as f:
+        return os.path.join(transcript_dir, f'candidate_{self.candidate_id}_{self.interview_name}.json')
+
+    def _record_answer(self, question_id, question, answer):
+        record = {
+            "question_id": question_id,
+            "question": question,
+            "answer": answer
+        }
+        self.transcript.append(record)
+        self._tx_fp.write(orjson.dumps(record).decode() + '\n')
+
+    def save_transcript(self):
+        """Save the consolidated interview transcript to a JSON file."""
+        self._tx_fp.close()
+        filename = self.transcript_path
+        # Write to a temp file and swap it in so a crash never leaves a half-written transcript
+        tmp_filename = filename + '.tmp'
+        with open(tmp_filename, 'w') as f:
             json.dump(self.transcript, f, indent=4)
+        os.replace(tmp_filename, filename)
         print(f"\n✅ Interview complete! Transcript saved to {filename}")
 
-    def _ask_question_and_record(self, question, question_id="dynamic"):
+    def _prepare_resume_questions(self):
+        """Extract the resume and generate questions from it; runs in the background during Phase 1."""
+        resume_path = os.path.join('resumes', f'r{self.candidate_id}.pdf')
+        resume_text = extract_text_from_pdf(resume_path)
+        return generate_resume_questions(resume_text)
+
+    def _ask_question_and_record(self, question, question_id="dynamic", next_text=None):
         self.speak(question)
+        # Overlap the next synthesis with the candidate's answer
+        self.prefetch_speech(next_text)
         key = self.wait_for_key()
         if key['q']:
             return "quit"
         if key['e']:
-            answer_bytes = self.audio_handler.listen_for_audio()
-            if answer_bytes:
-                answer_text = self.speech_to_text(answer_bytes)
-                self.transcript.append({
-                    "question_id": question_id,
-                    "question": question,
-                    "answer": answer_text or "No answer recorded."
-                })
+            if self.audio_handler.listen_for_audio():
+                answer_text = self.speech_to_text()
+                self._record_answer(question_id, question, answer_text or "No answer recorded.")
             else:
-                self.transcript.append({
-                    "question_id": question_id,
-                    "question": question,
-                    "answer": "No answer recorded."
-                })
+                self._record_answer(question_id, question, "No answer recorded.")
+
+    def close(self):
+        """Release the executor, audio devices and transcript file; safe to call more than once."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.audio_handler.close()
+        if self._tx_fp is not None:
+            self._tx_fp.close()
 
     def start_interview(self):
+        try:
+            self._run_interview()
+        finally:
+            # Runs on every exit path, including the early return on missing API keys
+            self.close()
+
+    def _run_interview(self):
         print("🤖 AI Interviewer Started!")
         print("=" * 50)
         
@@ -187,35 +409,49 @@ class AIInterviewer:
             print("❌ Please ensure GROQ_API_KEY and RIME_API_KEY are set.")
             return
 
+        # Each answer is appended here as soon as it is recorded, so nothing is lost if the process dies.
+        # Truncated per interview so it always matches the consolidated JSON written at the end.
+        self._tx_fp = open(os.path.splitext(self.transcript_path)[0] + '.jsonl', 'w', buffering=1)
+
         # Introduction
         intro = f"Hello, and welcome to your {self.interview_name} interview. My name is Rime, and I'll be guiding you through some questions today. Let's begin."
+        resume_intro = "Great. Now I will ask a few questions based on your resume."
+        self._resume_future = self.executor.submit(self._prepare_resume_questions)
+        if self.questions:
+            self.prefetch_speech(self.questions[0]['question'])
         self.speak(intro)
         
         try:
             # Phase 1: Pre-recorded questions
-            for item in self.questions:
-                if self._ask_question_and_record(item['question'], item['id']) == "quit":
+            for i, item in enumerate(self.questions):
+                next_text = self.questions[i + 1]['question'] if i + 1 < len(self.questions) else resume_intro
+                if self._ask_question_and_record(item['question'], item['id'], next_text) == "quit":
                     raise KeyboardInterrupt
 
             # Phase 2: Resume-based questions
-            self.speak("Great. Now I will ask a few questions based on your resume.")
-            resume_path = os.path.join('resumes', f'r{self.candidate_id}.pdf')
+            resume_error = None
             try:
-                resume_text = extract_text_from_pdf(resume_path)
-                resume_questions = generate_resume_questions(resume_text)
-                
-                if not resume_questions:
-                    self.speak("I couldn't generate any questions from your resume, but we'll proceed.")
-                else:
-                    for question in resume_questions:
-                         if self._ask_question_and_record(question) == "quit":
-                            raise KeyboardInterrupt
-
-            except FileNotFoundError:
-                self.speak("I couldn't find a resume for you, so we'll skip the resume-based questions.")
+                # Usually already finished while Phase 1 was running
+                resume_questions = self._resume_future.result()
             except Exception as e:
+                resume_questions, resume_error = [], e
+            if resume_questions:
+                # Synthesize the first question while the transition line plays
+                self.prefetch_speech(resume_questions[0])
+            self.speak(resume_intro)
+
+            if isinstance(resume_error, FileNotFoundError):
+                self.speak("I couldn't find a resume for you, so we'll skip the resume-based questions.")
+            elif resume_error is not None:
                 self.speak("I ran into an issue processing your resume, so we'll skip that part.")
-                print(f"Error during resume phase: {e}")
+                print(f"Error during resume phase: {resume_error}")
+            elif not resume_questions:
+                self.speak("I couldn't generate any questions from your resume, but we'll proceed.")
+            else:
+                for i, question in enumerate(resume_questions):
+                    next_text = resume_questions[i + 1] if i + 1 < len(resume_questions) else None
+                    if self._ask_question_and_record(question, next_text=next_text) == "quit":
+                        raise KeyboardInterrupt
 
         except KeyboardInterrupt:
             print("\n👋 Ending interview early.")
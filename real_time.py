@@ -1,6 +1,15 @@
 import fitz  # PyMuPDF
 from groq import Groq
+import httpx
+import functools
 import os
+import json
+
+@functools.lru_cache(maxsize=1)
+def get_groq_client():
+    """Shared Groq client on a pooled HTTP/2 connection, reused for every LLM call."""
+    http_client = httpx.Client(http2=True, limits=httpx.Limits(max_keepalive_connections=4))
+    return Groq(api_key=os.getenv("GROQ_API_KEY"), http_client=http_client)
 
 def extract_text_from_pdf(pdf_path):
     """Extracts text from a PDF file."""
@@ -17,12 +26,12 @@ def generate_resume_questions(resume_text):
     """
     Uses Groq to generate three insightful questions based on the resume text.
     """
-    client = Groq(api_key=os.getenv("GROQ_API_KEY"))
+    client = get_groq_client()
     
     prompt = f"""
     Based on the following resume, please generate exactly three insightful and concise interview questions.
     The questions should be suitable for a verbal interview.
-    Return the questions as a JSON list of strings. For example: ["Question 1?", "Question 2?", "Question 3?"]
+    Return the questions as a JSON object with a "questions" list of strings. For example: {{"questions": ["Question 1?", "Question 2?", "Question 3?"]}}
 
     Resume Text:
     ---
@@ -48,7 +57,6 @@ def generate_resume_questions(resume_text):
         response_content = chat_completion.choices[0].message.content
         # The response is a JSON string, so we need to parse it.
         # Assuming the response is like `{"questions": [...]}`
-        import json
         questions = json.loads(response_content)
         return questions.get("questions", [])
 
@@ -1,16 +1,57 @@
 import requests
+from requests.adapters import HTTPAdapter
 import os
+import ssl
 
-def rime_tts(text, output_filename, speaker="doe_john", modelId="arcana", api_key=None):
+RIME_TTS_URL = "https://users.rime.ai/v1/rime-tts"
+
+# Shared keep-alive session so repeated synthesis skips the TCP/TLS handshake
+session = requests.Session()
+# Sized for the interviewer's 3 background workers plus the main thread's streaming playback
+session.mount("https://", HTTPAdapter(pool_connections=2, pool_maxsize=4))
+
+def check_tls_crypto():
+    """
+    Warn if TLS decryption of the audio stream is likely to be slow.
+    Checks that Python links OpenSSL 3, that AES-GCM is the preferred cipher,
+    and that the CPU advertises AES-NI without OPENSSL_ia32cap masking it.
     """
-    Synthesize speech from text using the Rime API and save as MP3.
+    warnings = []
+    if ssl.OPENSSL_VERSION_INFO < (3,):
+        warnings.append(f"Python is linked against {ssl.OPENSSL_VERSION}; OpenSSL 3 is recommended")
+    cipher = ssl.create_default_context().get_ciphers()[0]['name']
+    if 'AES' not in cipher or 'GCM' not in cipher:
+        warnings.append(f"preferred TLS cipher is {cipher}, not AES-GCM")
+    if os.path.exists('/proc/cpuinfo'):
+        with open('/proc/cpuinfo', 'r') as f:
+            flags = next((line.split(':', 1)[1].split() for line in f if line.startswith('flags')), [])
+        if flags and 'aes' not in flags:
+            warnings.append("CPU does not report AES-NI support")
+    if os.getenv("OPENSSL_ia32cap"):
+        warnings.append("OPENSSL_ia32cap is set and may be disabling AES-NI")
+    for warning in warnings:
+        print(f"⚠️ TLS performance: {warning}")
+    return warnings
+
+check_tls_crypto()
+
+def warm_up():
+    """Open a connection to the Rime host ahead of the first synthesis."""
+    try:
+        session.head("https://users.rime.ai", timeout=5)
+    except requests.RequestException:
+        pass
+
+def rime_tts(text, speaker="doe_john", modelId="arcana", api_key=None, chunk_size=4096):
+    """
+    Synthesize speech from text using the Rime API and return a generator of MP3 bytes as they arrive.
+    The request is made and checked up front, so auth and HTTP errors raise here rather than mid-playback.
     :param text: The text to synthesize.
-    :param output_filename: The filename to save the MP3 audio.
     :param speaker: The speaker voice to use (default: 'doe_john').
     :param modelId: The model to use (default: 'arcana').
     :param api_key: The RIME API key (default: from env RIME_API_KEY).
+    :param chunk_size: Size of the MP3 chunks yielded from the HTTP stream.
     """
-    url = "https://users.rime.ai/v1/rime-tts"
     if api_key is None:
         api_key = os.getenv("RIME_API_KEY")
     if not api_key:
@@ -30,13 +71,22 @@ def rime_tts(text, output_filename, speaker="doe_john", modelId="arcana", api_ke
         "Authorization": f"Bearer {api_key}",
         "Content-Type": "application/json"
     }
-    response = requests.post(url, json=payload, headers=headers, stream=True)
-    if response.status_code == 200:
-        with open(output_filename, "wb") as f:
-            for chunk in response.iter_content(chunk_size=1024):
+    response = session.post(RIME_TTS_URL, json=payload, headers=headers, stream=True)
+    if response.status_code != 200:
+        try:
+            raise RuntimeError(f"Rime API error: {response.status_code} {response.text}")
+        finally:
+            response.close()
+
+    def stream_chunks():
+        # Closing the generator (including when it is abandoned) releases the connection
+        try:
+            for chunk in response.iter_content(chunk_size=chunk_size):
                 if chunk:
-                    f.write(chunk)
-    else:
-        raise RuntimeError(f"Rime API error: {response.status_code} {response.text}")
+                    yield chunk
+        finally:
+            response.close()
+
+    return stream_chunks()
 
 # End of module. No print statements needed unless for debugging.
\ No newline at end of file